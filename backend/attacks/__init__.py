@@ -3,3 +3,6 @@ from .pgd import pgd
 from .blur import blur
 from .sp_noise import sp_noise
 from .patch import patch
+from .universal import universal, learned_patch
+from .blackbox import simba, random_search
+from .cancel import AttackCancelled
@@ -0,0 +1,184 @@
+import time
+import torch
+from ..utils import IMAGENET_MEAN, IMAGENET_STD
+from .cancel import check_cancelled
+
+class QueryEngine:
+    """
+    Score-only access to a model with a query budget.
+
+    Candidates are scored in large `torch.no_grad` batches, and every image
+    scored counts as one query.
+    """
+
+    def __init__(self, model, label, max_queries, batch_size, should_stop=None):
+        # With label=None the prediction on the first scored image is used
+        if batch_size < 1:
+            raise ValueError("query_batch must be at least 1")
+        # The attacks spend up to two queries before their first search round
+        if max_queries < 2:
+            raise ValueError("max_queries must be at least 2")
+        self.model = model
+        self.should_stop = should_stop
+        self.label = label
+        self.max_queries = max_queries
+        self.batch_size = batch_size
+        self.queries = 0
+        self.forward_passes = 0
+        self.start = time.perf_counter()
+
+    @property
+    def remaining(self):
+        return self.max_queries - self.queries
+
+    def scores(self, candidates):
+        """Return (true-class probability, margin) for each candidate."""
+        if len(candidates) > self.remaining:
+            raise ValueError(f"Scoring {len(candidates)} candidates would exceed the query budget")
+        probs, margins = [], []
+        with torch.no_grad():
+            for chunk in candidates.split(self.batch_size):
+                check_cancelled(self.should_stop)
+                logits = self.model(chunk)
+                if self.label is None:
+                    self.label = logits[0].argmax().item()
+                self.queries += len(chunk)
+                self.forward_passes += 1
+                probs.append(torch.softmax(logits, dim=1)[:, self.label])
+                true_logit = logits[:, self.label].clone()
+                logits[:, self.label] = float("-inf")
+                margins.append(true_logit - logits.max(dim=1).values)
+        return torch.cat(probs), torch.cat(margins)
+
+    def stats(self, success):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "queries": self.queries,
+            "forward_passes": self.forward_passes,
+            "success": success,
+            "elapsed": elapsed,
+            "queries_per_sec": self.queries / elapsed if elapsed > 0 else None,
+        }
+
+def simba(model, input_tensor, epsilon, max_queries=1000, batch_size=100, should_stop=None):
+    """
+    Batched SimBA (simple black-box attack) in the pixel basis, for a single
+    image (batch of 1).
+
+    Each round tries +/- epsilon on `batch_size // 2` untried coordinates in a
+    single forward pass, keeps every coordinate whose better sign lowers the
+    true-class probability, and falls back to the single best coordinate if
+    the combined step does not help. Stops as soon as the label flips.
+
+    Returns the perturbed tensor and query statistics.
+    """
+    original = input_tensor.clone().detach()
+    engine = QueryEngine(model, None, max_queries, batch_size, should_stop)
+    perturbed = original.clone()
+    prob, margin = engine.scores(perturbed)
+    prob, margin = prob.item(), margin.item()
+
+    n_coords = original.numel()
+    order = torch.randperm(n_coords)
+    position = 0
+    per_round = max(1, batch_size // 2)
+
+    while margin >= 0 and engine.remaining >= 2:
+        k = min(per_round, engine.remaining // 2)
+        coords = order[torch.arange(position, position + k) % n_coords]
+        position += k
+
+        # Candidate i is +epsilon on coords[i], candidate k + i is -epsilon
+        rows = torch.arange(k)
+        candidates = perturbed.reshape(1, -1).repeat(2 * k, 1)
+        candidates[rows, coords] += epsilon
+        candidates[rows + k, coords] -= epsilon
+        candidates = _project(candidates.view(2 * k, *original.shape[1:]), original, epsilon)
+
+        probs, margins = engine.scores(candidates)
+        if margins.min() < 0:
+            best = margins.argmin()
+            perturbed = candidates[best:best+1]
+            margin = margins[best].item()
+            break
+
+        plus, minus = probs[:k], probs[k:]
+        use_plus = plus <= minus
+        better = torch.where(use_plus, plus, minus)
+        improving = better < prob
+        if not improving.any():
+            continue
+
+        best = better.argmin().item()
+        best_index = best if use_plus[best] else best + k
+        if improving.sum() > 1 and engine.remaining >= 1:
+            signs = use_plus.float() * 2 - 1
+            merged = perturbed.reshape(1, -1).clone()
+            merged[0, coords[improving]] += epsilon * signs[improving]
+            merged = _project(merged.view_as(original), original, epsilon)
+            merged_prob, merged_margin = engine.scores(merged)
+            if merged_prob.item() < better[best].item():
+                perturbed, prob, margin = merged, merged_prob.item(), merged_margin.item()
+                continue
+        perturbed = candidates[best_index:best_index+1]
+        prob, margin = better[best].item(), margins[best_index].item()
+
+    return perturbed.detach(), engine.stats(margin < 0)
+
+def random_search(model, input_tensor, epsilon, max_queries=1000, batch_size=100, should_stop=None):
+    """
+    Square-style random search on the L-inf ball, for a single image (batch
+    of 1).
+
+    Each round samples `batch_size` random square updates of +/- epsilon per
+    channel, scores them in one forward pass and keeps the one with the lowest
+    margin (true logit minus best other logit) if it improves. Square size
+    shrinks as the budget is used. Stops as soon as the label flips.
+
+    Returns the perturbed tensor and query statistics.
+    """
+    original = input_tensor.clone().detach()
+    engine = QueryEngine(model, None, max_queries, batch_size, should_stop)
+    engine.scores(original)
+
+    _, channels, h, w = original.shape
+    # Start from random vertical stripes, as in the Square attack
+    init = epsilon * torch.sign(torch.randn(1, channels, 1, w))
+    perturbed = _project(original + init, original, epsilon)
+    _, margin = engine.scores(perturbed)
+    margin = margin.item()
+
+    while margin >= 0 and engine.remaining >= 1:
+        n = min(batch_size, engine.remaining)
+        fraction = 0.1 * (1 - engine.queries / max_queries) + 0.005
+        size = max(1, min(h, int(round((fraction * h * w) ** 0.5))))
+
+        ys = torch.randint(0, h - size + 1, (n,))
+        xs = torch.randint(0, w - size + 1, (n,))
+        values = epsilon * torch.sign(torch.randn(n, channels, 1, 1))
+        candidates = perturbed.repeat(n, 1, 1, 1)
+        delta = candidates - original
+        for i in range(n):
+            y, x = ys[i], xs[i]
+            delta[i, :, y:y+size, x:x+size] = values[i]
+        candidates = _project(original + delta, original, epsilon)
+
+        _, margins = engine.scores(candidates)
+        best = margins.argmin()
+        if margins[best].item() < margin:
+            perturbed = candidates[best:best+1]
+            margin = margins[best].item()
+
+    return perturbed.detach(), engine.stats(margin < 0)
+
+def _valid_range(like):
+    """Per-channel bounds of ImageNet-normalized pixels, i.e. [0, 1] before normalization."""
+    mean = torch.tensor(IMAGENET_MEAN, dtype=like.dtype).view(1, -1, 1, 1)
+    std = torch.tensor(IMAGENET_STD, dtype=like.dtype).view(1, -1, 1, 1)
+    return (0 - mean) / std, (1 - mean) / std
+
+def _project(perturbed, original, epsilon):
+    """Project onto the epsilon L-inf ball around `original` and the valid pixel range."""
+    delta = torch.clamp(perturbed - original, -epsilon, epsilon)
+    low, high = _valid_range(perturbed)
+    return torch.max(torch.min(original + delta, high), low)
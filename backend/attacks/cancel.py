@@ -0,0 +1,7 @@
+class AttackCancelled(Exception):
+    """Raised inside an iterative attack when its caller asks it to stop."""
+
+def check_cancelled(should_stop):
+    """Raise AttackCancelled if the optional `should_stop` callable returns True."""
+    if should_stop is not None and should_stop():
+        raise AttackCancelled()
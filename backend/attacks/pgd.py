@@ -1,24 +1,39 @@
 import torch
+from .cancel import check_cancelled
 
-def pgd(model, input_tensor, epsilon, steps):
+def pgd(model, input_tensor, epsilon, steps, restarts=1, should_stop=None):
     """
     Projected Gradient Descent attack
+
+    Every step increases the loss of the clean prediction, as in pgd_restarts.
+    With restarts > 1, all restarts of all images run together as one batch,
+    see pgd_restarts. `should_stop` is checked before every step and raises
+    AttackCancelled when it returns True.
     """
+    if restarts < 1:
+        raise ValueError("restarts must be at least 1")
+    if restarts > 1:
+        return pgd_restarts(model, input_tensor, epsilon, steps, restarts, should_stop)
+
     # Create a copy of the input tensor
     perturbed = input_tensor.clone().detach()
     
     # Store original input for projection
     original = input_tensor.clone().detach()
+    target = None
     
     for step in range(steps):
+        check_cancelled(should_stop)
+
         # Enable gradient computation
         perturbed.requires_grad_(True)
         
         # Forward pass
         output = model(perturbed)
         
-        # Create target (use predicted class as target for untargeted attack)
-        target = output.argmax(dim=1)
+        # Target the clean prediction (the first step runs on the clean input)
+        if target is None:
+            target = output.argmax(dim=1).detach()
         
         # Compute loss
         loss = torch.nn.functional.cross_entropy(output, target)
@@ -46,3 +61,75 @@ def pgd(model, input_tensor, epsilon, steps):
         perturbed = torch.clamp(perturbed, 0, 1)
     
     return perturbed.detach()
+
+def pgd_restarts(model, input_tensor, epsilon, steps, restarts, should_stop=None):
+    """
+    Batched multi-restart PGD.
+
+    Restart 0 of each image starts from the clean image and the others from a
+    uniform random point in the epsilon ball. Every restart of every image is
+    stacked into one batch, so each step is a single forward/backward pass.
+    As soon as one restart of an image is misclassified, it is kept and all
+    restarts of that image are dropped from the batch. Images that are never
+    misclassified keep their highest-loss restart.
+    """
+    n = input_tensor.shape[0]
+    original = input_tensor.clone().detach()
+    with torch.no_grad():
+        labels = model(original).argmax(dim=1)
+
+    # Row i * restarts + r holds restart r of image i
+    image_index = torch.arange(n, device=original.device).repeat_interleave(restarts)
+    stacked_original = original.repeat_interleave(restarts, dim=0)
+    stacked_labels = labels.repeat_interleave(restarts)
+
+    noise = torch.empty_like(stacked_original).uniform_(-epsilon, epsilon)
+    noise[::restarts] = 0
+    perturbed = torch.clamp(stacked_original + noise, 0, 1)
+
+    best = original.clone()
+    best_loss = torch.full((n,), float("-inf"), device=original.device)
+    done = torch.zeros(n, dtype=torch.bool, device=original.device)
+    active = torch.arange(n * restarts, device=original.device)
+
+    def select(rows, candidates, output):
+        """Keep the first successful or highest-loss restart per image."""
+        loss = torch.nn.functional.cross_entropy(output, stacked_labels[rows], reduction="none")
+        success = output.argmax(dim=1) != stacked_labels[rows]
+        for i in image_index[rows].unique().tolist():
+            mine = image_index[rows] == i
+            hits = (mine & success).nonzero()
+            if len(hits) > 0:
+                best[i] = candidates[hits[0, 0]]
+                done[i] = True
+                continue
+            row_loss = torch.where(mine, loss, torch.full_like(loss, float("-inf")))
+            j = row_loss.argmax()
+            if row_loss[j] > best_loss[i]:
+                best_loss[i] = row_loss[j]
+                best[i] = candidates[j]
+
+    for step in range(steps):
+        check_cancelled(should_stop)
+        current = perturbed[active].requires_grad_(True)
+        output = model(current)
+        loss = torch.nn.functional.cross_entropy(output, stacked_labels[active], reduction="none")
+
+        # Gradients w.r.t. the inputs only; model weight gradients are never needed
+        data_grad = torch.autograd.grad(loss.sum(), current)[0]
+        select(active, current.detach(), output.detach())
+
+        stepped = current.detach() + (epsilon / steps) * data_grad.sign()
+        delta = torch.clamp(stepped - stacked_original[active], -epsilon, epsilon)
+        perturbed[active] = torch.clamp(stacked_original[active] + delta, 0, 1)
+
+        # Prune every restart of images that already have a successful restart
+        active = active[~done[image_index[active]]]
+        if len(active) == 0:
+            break
+
+    if len(active) > 0:
+        with torch.no_grad():
+            select(active, perturbed[active], model(perturbed[active]))
+
+    return best.detach()
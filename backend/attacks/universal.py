@@ -0,0 +1,29 @@
+import torch
+import random
+
+def universal(input_tensor, perturbation):
+    """
+    Apply a precomputed universal perturbation.
+
+    A single broadcast add, so the cost is independent of the model.
+    """
+    with torch.no_grad():
+        return torch.clamp(input_tensor + perturbation.to(input_tensor.device), 0, 1)
+
+def learned_patch(input_tensor, patch, location=None):
+    """
+    Paste a precomputed adversarial patch of shape (channels, size, size).
+
+    The patch goes at a random location unless `location` (y, x) is given and
+    is pasted into every image in the batch with one slice assignment.
+    """
+    patched = input_tensor.clone()
+    h, w = patched.shape[2:]
+    size = patch.shape[-1]
+    if location is None:
+        y = random.randint(0, h-size)
+        x = random.randint(0, w-size)
+    else:
+        y, x = location
+    patched[:, :, y:y+size, x:x+size] = patch.to(patched.device)
+    return patched
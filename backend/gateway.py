@@ -0,0 +1,360 @@
+"""
+Model-affinity gateway for the Adversarial Attacks API.
+
+Runs a pool of `backend.main` worker processes, each pinned to a subset of
+models and a set of CPU cores, and forwards `/predict/` and `/attack/` to the
+least-loaded worker serving the requested model. Workers are restarted if
+they crash, so every model is loaded by as few processes as the topology asks
+for instead of once per uvicorn worker.
+
+Run with:
+    python -m backend.gateway --port 8000
+    python -m backend.gateway --topology local   # small two-worker test setup
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kept in sync with backend.models.MODEL_NAMES; duplicated so the gateway
+# process never has to import torch.
+MODEL_NAMES = ["ResNet18", "EfficientNet_B0", "MobileNetV2"]
+
+BASE_WORKER_PORT = int(os.environ.get("ADV_GATEWAY_BASE_PORT", 8100))
+HEALTH_INTERVAL = 1.0
+RESTART_BACKOFF = 2.0
+REQUEST_TIMEOUT = 300
+
+
+@dataclass
+class WorkerSpec:
+    """Models and CPU cores assigned to one worker process."""
+    models: List[str]
+    cores: List[int]
+    port: int
+
+
+@dataclass
+class Worker:
+    spec: WorkerSpec
+    process: Optional[subprocess.Popen] = None
+    ready: bool = False
+    inflight: int = 0
+    restarts: int = 0
+    started_at: float = 0.0
+    served: int = 0
+    next_restart_at: Optional[float] = None
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_topology(models=None, cores=None, replicas=1, base_port=BASE_WORKER_PORT):
+    """
+    Split the available cores into one worker group per model.
+
+    Each model gets `replicas` workers and every worker gets a disjoint slice
+    of the cores; leftover cores go one each to the first workers, so every
+    core is used. With fewer cores than workers, each worker gets one core and
+    cores are shared.
+    """
+    models = list(models or MODEL_NAMES)
+    cores = list(cores or available_cores())
+    n_workers = len(models) * replicas
+    per_worker, extra = divmod(len(cores), n_workers)
+
+    specs = []
+    start = 0
+    for i in range(n_workers):
+        if per_worker == 0:
+            worker_cores = [cores[i % len(cores)]]
+        else:
+            size = per_worker + (1 if i < extra else 0)
+            worker_cores = cores[start:start + size]
+            start += size
+        specs.append(WorkerSpec(
+            models=[models[i % len(models)]],
+            cores=worker_cores,
+            port=base_port + i,
+        ))
+    return specs
+
+
+def local_test_topology(base_port=BASE_WORKER_PORT):
+    """
+    Two single-core workers sharing the three models, for exercising routing,
+    queueing and crash recovery on a laptop.
+    """
+    cores = available_cores()
+    return [
+        WorkerSpec(models=["ResNet18", "MobileNetV2"], cores=[cores[0]], port=base_port),
+        WorkerSpec(models=["EfficientNet_B0"], cores=[cores[-1]], port=base_port + 1),
+    ]
+
+
+def load_topology(value):
+    """Parse a topology given as 'auto', 'local' or a JSON list of worker specs."""
+    if not value or value == "auto":
+        replicas = int(os.environ.get("ADV_GATEWAY_REPLICAS", 1))
+        return plan_topology(replicas=replicas)
+    if value == "local":
+        return local_test_topology()
+    return [WorkerSpec(**spec) for spec in json.loads(value)]
+
+
+class WorkerPool:
+    """Spawns, supervises and routes requests to worker processes."""
+
+    def __init__(self, specs, app_path="backend.main:app"):
+        self.workers = [Worker(spec=spec) for spec in specs]
+        # ASGI app each worker runs; tests substitute a stub that needs no torch
+        self.app_path = app_path
+        self.session = requests.Session()
+        self._supervisor = None
+
+    def spawn(self, worker):
+        spec = worker.spec
+        env = dict(os.environ)
+        env["ADV_WORKER_MODELS"] = ",".join(spec.models)
+        # Keep torch intra-op threads within the pinned core set
+        env["OMP_NUM_THREADS"] = str(len(spec.cores))
+        env["MKL_NUM_THREADS"] = str(len(spec.cores))
+
+        worker.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app_path,
+             "--host", "127.0.0.1", "--port", str(spec.port), "--log-level", "warning"],
+            env=env,
+        )
+        # Pin from the parent rather than in preexec_fn, which is not safe once
+        # the gateway has threadpool threads. The child is still starting the
+        # interpreter here, so torch's threads inherit the mask.
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(worker.process.pid, spec.cores)
+            except OSError as e:
+                logger.error(f"Could not pin worker pid={worker.process.pid} to cores "
+                             f"{spec.cores}: {str(e)}")
+        worker.ready = False
+        worker.started_at = time.monotonic()
+        logger.info(f"Started worker pid={worker.process.pid} port={spec.port} "
+                    f"models={spec.models} cores={spec.cores}")
+
+    def _healthy(self, worker):
+        try:
+            resp = self.session.get(f"http://127.0.0.1:{worker.spec.port}/", timeout=1)
+            return resp.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _restart_exited(self, worker):
+        """Schedule a restart for a worker whose process exited, and run it when due."""
+        now = time.monotonic()
+        if worker.next_restart_at is None:
+            logger.error(f"Worker on port {worker.spec.port} exited with code "
+                         f"{worker.process.returncode}, restarting")
+            worker.ready = False
+            worker.restarts += 1
+            # Avoid a tight crash loop when a worker dies on startup
+            crashed_on_startup = now - worker.started_at < RESTART_BACKOFF
+            worker.next_restart_at = now + RESTART_BACKOFF if crashed_on_startup else now
+        if now >= worker.next_restart_at:
+            # Stays scheduled if spawn() raises, so the next attempt is also backed off
+            worker.next_restart_at = now + RESTART_BACKOFF
+            self.spawn(worker)
+            worker.next_restart_at = None
+
+    async def supervise(self):
+        while True:
+            for worker in self.workers:
+                try:
+                    if worker.process.poll() is not None:
+                        self._restart_exited(worker)
+                    elif not worker.ready:
+                        worker.ready = await run_in_threadpool(self._healthy, worker)
+                        if worker.ready:
+                            logger.info(f"Worker on port {worker.spec.port} is ready")
+                except Exception:
+                    # One failing worker must not stop supervision of the others
+                    logger.exception(f"Supervising worker on port {worker.spec.port} failed")
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    def start(self):
+        for worker in self.workers:
+            self.spawn(worker)
+        self._supervisor = asyncio.create_task(self.supervise())
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    worker.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        self.session.close()
+
+    def models(self):
+        return sorted({name for w in self.workers for name in w.spec.models})
+
+    def pick(self, model_name):
+        """Return the ready worker for `model_name` with the shortest queue."""
+        candidates = [w for w in self.workers if model_name in w.spec.models and w.ready]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (w.inflight, w.served))
+
+    async def forward(self, path, model_name, data, files):
+        worker = self.pick(model_name)
+        if worker is None:
+            raise HTTPException(status_code=503, detail=f"No worker available for model {model_name}")
+
+        worker.inflight += 1
+        try:
+            resp = await run_in_threadpool(
+                self.session.post,
+                f"http://127.0.0.1:{worker.spec.port}{path}",
+                data=data, files=files, timeout=REQUEST_TIMEOUT,
+            )
+        except requests.exceptions.RequestException as e:
+            # The supervisor notices dead processes; mark unready so we stop routing here
+            worker.ready = False
+            logger.error(f"Worker on port {worker.spec.port} failed: {str(e)}")
+            raise HTTPException(status_code=502, detail=f"Worker request failed: {str(e)}")
+        finally:
+            worker.inflight -= 1
+        worker.served += 1
+        try:
+            content = resp.json()
+        except ValueError:
+            # e.g. a plain-text 500 from a crashing worker
+            logger.error(f"Worker on port {worker.spec.port} returned non-JSON status {resp.status_code}")
+            raise HTTPException(status_code=502,
+                                detail=f"Worker returned status {resp.status_code}: {resp.text[:500]}")
+        return JSONResponse(content, status_code=resp.status_code)
+
+    def status(self):
+        return [
+            {
+                "port": w.spec.port,
+                "models": w.spec.models,
+                "cores": w.spec.cores,
+                "pid": w.process.pid if w.process else None,
+                "ready": w.ready,
+                "inflight": w.inflight,
+                "served": w.served,
+                "restarts": w.restarts,
+            }
+            for w in self.workers
+        ]
+
+
+pool = WorkerPool(load_topology(os.environ.get("ADV_GATEWAY_TOPOLOGY")))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    pool.start()
+    yield
+    await pool.stop()
+
+
+app = FastAPI(
+    title="Adversarial Attacks Gateway",
+    description="Routes requests to model-pinned Adversarial Attacks API workers",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.get("/")
+async def root():
+    return {"message": "Adversarial Attacks API", "status": "running", "models": pool.models()}
+
+
+@app.get("/workers/")
+async def workers():
+    return pool.status()
+
+
+async def _proxy(path, request):
+    form = await request.form()
+    model_name = form.get("model_name")
+    if model_name not in pool.models():
+        raise HTTPException(status_code=400, detail="Invalid model name")
+
+    data = {}
+    files = {}
+    for key, value in form.multi_items():
+        if hasattr(value, "read"):
+            files[key] = (value.filename, await value.read(), value.content_type)
+        else:
+            data[key] = value
+    return await pool.forward(path, model_name, data, files)
+
+
+@app.post("/predict/")
+async def predict(request: Request):
+    return await _proxy("/predict/", request)
+
+
+@app.post("/attack/")
+async def attack(request: Request):
+    return await _proxy("/attack/", request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the model-affinity gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--topology", default=None,
+                        help="'auto' (default), 'local' or a JSON list of "
+                             "{\"models\": [...], \"cores\": [...], \"port\": N}")
+    parser.add_argument("--replicas", type=int, default=None,
+                        help="Workers per model for the 'auto' topology")
+    args = parser.parse_args()
+
+    # The pool is built at import time, so pass settings through the
+    # environment before uvicorn imports the app.
+    if args.topology:
+        os.environ["ADV_GATEWAY_TOPOLOGY"] = args.topology
+    if args.replicas:
+        os.environ["ADV_GATEWAY_REPLICAS"] = str(args.replicas)
+
+    import uvicorn
+    uvicorn.run("backend.gateway:app", host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
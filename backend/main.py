@@ -1,19 +1,32 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .models import get_model, get_imagenet_labels
+from .models import MODEL_NAMES, get_model, get_imagenet_labels
 from .utils import preprocess_image, get_top5_predictions, image_to_base64
-from .attacks import fgsm, pgd, blur, sp_noise, patch
+from .attacks import fgsm, pgd, blur, sp_noise, patch, universal, learned_patch, simba, random_search, AttackCancelled
+from .perturbations import load_perturbation
+import asyncio
 import io
+import json
+import threading
 import torch
 import numpy as np
 from PIL import Image
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Models this process is allowed to serve. The gateway pins each worker to a
+# subset of models through ADV_WORKER_MODELS; standalone servers serve all.
+SERVED_MODELS = [
+    name for name in os.environ.get("ADV_WORKER_MODELS", ",".join(MODEL_NAMES)).split(",")
+    if name in MODEL_NAMES
+]
+
 app = FastAPI(
     title="Adversarial Attacks API",
     description="API for demonstrating adversarial attacks on computer vision models",
@@ -30,12 +43,12 @@ app.add_middleware(
 
 @app.get("/")
 async def root():
-    return {"message": "Adversarial Attacks API", "status": "running"}
+    return {"message": "Adversarial Attacks API", "status": "running", "models": SERVED_MODELS}
 
 @app.post("/predict/")
 async def predict(model_name: str = Form(...), file: UploadFile = File(...)):
     try:
-        if model_name not in ["ResNet18", "EfficientNet_B0", "MobileNetV2"]:
+        if model_name not in SERVED_MODELS:
             raise HTTPException(status_code=400, detail="Invalid model name")
             
         image_bytes = await file.read()
@@ -50,86 +63,276 @@ async def predict(model_name: str = Form(...), file: UploadFile = File(...)):
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+ATTACK_TYPES = ["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch", "Universal", "LearnedPatch", "SimBA", "RandomSearch"]
+
+# Attack parameters and their defaults, shared by /attack/ and /ws/session
+ATTACK_DEFAULTS = {
+    "epsilon": 0.03,
+    "steps": 10,
+    "restarts": 1,
+    "kernel_size": 3,
+    "noise_level": 0.05,
+    "max_queries": 1000,
+    "query_batch": 100,
+}
+
+def run_attack(model_name, input_tensor, attack_type, epsilon=0.03, steps=10, restarts=1,
+               kernel_size=3, noise_level=0.05, max_queries=1000, query_batch=100, should_stop=None):
+    """
+    Run `attack_type` on a preprocessed input and build the /attack/ response.
+
+    `should_stop` is passed to the iterative attacks, which raise
+    AttackCancelled when it returns True.
+    """
+    if attack_type == "PGD" and restarts < 1:
+        raise HTTPException(status_code=400, detail="restarts must be at least 1")
+    if attack_type in ["SimBA", "RandomSearch"]:
+        if query_batch < 1:
+            raise HTTPException(status_code=400, detail="query_batch must be at least 1")
+        if max_queries < 2:
+            raise HTTPException(status_code=400, detail="max_queries must be at least 2")
+
+    model = get_model(model_name)
+    orig_preds = get_top5_predictions(model, input_tensor)
+    
+    # Generate adversarial example
+    query_stats = None
+    try:
+        if attack_type == "FGSM":
+            adv_tensor = fgsm(model, input_tensor, epsilon)
+        elif attack_type == "PGD":
+            adv_tensor = pgd(model, input_tensor, epsilon, steps, restarts, should_stop)
+        elif attack_type == "GaussianBlur":
+            adv_tensor = blur(input_tensor, kernel_size)
+        elif attack_type == "SaltPepper":
+            adv_tensor = sp_noise(input_tensor, noise_level)
+        elif attack_type == "Patch":
+            adv_tensor = patch(input_tensor)
+        elif attack_type == "Universal":
+            adv_tensor = universal(input_tensor, load_perturbation(model_name, "universal"))
+        elif attack_type == "LearnedPatch":
+            adv_tensor = learned_patch(input_tensor, load_perturbation(model_name, "patch"))
+        elif attack_type == "SimBA":
+            adv_tensor, query_stats = simba(model, input_tensor, epsilon, max_queries, query_batch, should_stop)
+        elif attack_type == "RandomSearch":
+            adv_tensor, query_stats = random_search(model, input_tensor, epsilon, max_queries, query_batch, should_stop)
+        
+        # Validate adversarial tensor
+        if adv_tensor is None or adv_tensor.shape != input_tensor.shape:
+            raise ValueError(f"Invalid adversarial tensor shape or None result from {attack_type}")
+            
+    except AttackCancelled:
+        raise
+    except FileNotFoundError as missing:
+        # No precomputed perturbation yet; the message says how to train one
+        raise HTTPException(status_code=404, detail=str(missing))
+    except Exception as attack_error:
+        logger.error(f"Attack {attack_type} failed: {str(attack_error)}")
+        raise HTTPException(status_code=500, detail=f"Attack {attack_type} failed: {str(attack_error)}")
+    
+    # Convert adversarial tensor back to image
+    try:
+        adv_numpy = adv_tensor.squeeze().permute(1, 2, 0).cpu().numpy()
+        
+        # Handle different tensor shapes
+        if len(adv_numpy.shape) == 2:  # Grayscale
+            adv_numpy = np.stack([adv_numpy] * 3, axis=-1)
+        elif adv_numpy.shape[2] == 1:  # Single channel
+            adv_numpy = np.repeat(adv_numpy, 3, axis=2)
+        
+        adv_numpy = (adv_numpy * 255).clip(0, 255).astype('uint8')
+        adv_image = Image.fromarray(adv_numpy)
+        
+    except Exception as convert_error:
+        logger.error(f"Tensor to image conversion failed: {str(convert_error)}")
+        raise HTTPException(status_code=500, detail=f"Image conversion failed: {str(convert_error)}")
+    
+    adv_preds = get_top5_predictions(model, adv_tensor)
+    adv_image_b64 = image_to_base64(adv_image)
+    
+    logger.info(f"Attack successful: {attack_type} on {model_name}")
+    if query_stats:
+        logger.info(f"{attack_type} used {query_stats['queries']} queries in "
+                    f"{query_stats['forward_passes']} forward passes ({query_stats['elapsed']:.2f}s)")
+    return {
+        "original": orig_preds,
+        "adversarial": adv_preds,
+        "adv_image": adv_image_b64,
+        "attack_info": {
+            "type": attack_type,
+            "model": model_name,
+            "parameters": {
+                "epsilon": epsilon if attack_type in ["FGSM", "PGD", "SimBA", "RandomSearch"] else None,
+                "steps": steps if attack_type == "PGD" else None,
+                "restarts": restarts if attack_type == "PGD" else None,
+                "kernel_size": kernel_size if attack_type == "GaussianBlur" else None,
+                "noise_level": noise_level if attack_type == "SaltPepper" else None,
+                "max_queries": max_queries if query_stats else None,
+                "query_batch": query_batch if query_stats else None
+            },
+            "queries": query_stats
+        }
+    }
+
 @app.post("/attack/")
 async def attack(
     model_name: str = Form(...),
     attack_type: str = Form(...),
     epsilon: float = Form(0.03),
     steps: int = Form(10),
+    restarts: int = Form(1),
     kernel_size: int = Form(3),
     noise_level: float = Form(0.05),
+    max_queries: int = Form(1000),
+    query_batch: int = Form(100),
     file: UploadFile = File(...)
 ):
     try:
-        if model_name not in ["ResNet18", "EfficientNet_B0", "MobileNetV2"]:
+        if model_name not in SERVED_MODELS:
             raise HTTPException(status_code=400, detail="Invalid model name")
             
-        if attack_type not in ["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch"]:
+        if attack_type not in ATTACK_TYPES:
             raise HTTPException(status_code=400, detail="Invalid attack type")
             
         image_bytes = await file.read()
         image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        model = get_model(model_name)
         input_tensor = preprocess_image(image)
-        orig_preds = get_top5_predictions(model, input_tensor)
-        
-        # Generate adversarial example
-        try:
-            if attack_type == "FGSM":
-                adv_tensor = fgsm(model, input_tensor, epsilon)
-            elif attack_type == "PGD":
-                adv_tensor = pgd(model, input_tensor, epsilon, steps)
-            elif attack_type == "GaussianBlur":
-                adv_tensor = blur(input_tensor, kernel_size)
-            elif attack_type == "SaltPepper":
-                adv_tensor = sp_noise(input_tensor, noise_level)
-            elif attack_type == "Patch":
-                adv_tensor = patch(input_tensor)
-            
-            # Validate adversarial tensor
-            if adv_tensor is None or adv_tensor.shape != input_tensor.shape:
-                raise ValueError(f"Invalid adversarial tensor shape or None result from {attack_type}")
-                
-        except Exception as attack_error:
-            logger.error(f"Attack {attack_type} failed: {str(attack_error)}")
-            raise HTTPException(status_code=500, detail=f"Attack {attack_type} failed: {str(attack_error)}")
-        
-        # Convert adversarial tensor back to image
-        try:
-            adv_numpy = adv_tensor.squeeze().permute(1, 2, 0).cpu().numpy()
-            
-            # Handle different tensor shapes
-            if len(adv_numpy.shape) == 2:  # Grayscale
-                adv_numpy = np.stack([adv_numpy] * 3, axis=-1)
-            elif adv_numpy.shape[2] == 1:  # Single channel
-                adv_numpy = np.repeat(adv_numpy, 3, axis=2)
-            
-            adv_numpy = (adv_numpy * 255).clip(0, 255).astype('uint8')
-            adv_image = Image.fromarray(adv_numpy)
-            
-        except Exception as convert_error:
-            logger.error(f"Tensor to image conversion failed: {str(convert_error)}")
-            raise HTTPException(status_code=500, detail=f"Image conversion failed: {str(convert_error)}")
-        
-        adv_preds = get_top5_predictions(model, adv_tensor)
-        adv_image_b64 = image_to_base64(adv_image)
-        
-        logger.info(f"Attack successful: {attack_type} on {model_name}")
-        return JSONResponse({
-            "original": orig_preds,
-            "adversarial": adv_preds,
-            "adv_image": adv_image_b64,
-            "attack_info": {
-                "type": attack_type,
-                "model": model_name,
-                "parameters": {
-                    "epsilon": epsilon if attack_type in ["FGSM", "PGD"] else None,
-                    "steps": steps if attack_type == "PGD" else None,
-                    "kernel_size": kernel_size if attack_type == "GaussianBlur" else None,
-                    "noise_level": noise_level if attack_type == "SaltPepper" else None
-                }
-            }
-        })
+        return JSONResponse(run_attack(
+            model_name, input_tensor, attack_type, epsilon, steps, restarts,
+            kernel_size, noise_level, max_queries, query_batch
+        ))
+    except HTTPException:
+        # Keep 400s for invalid input and the detailed 500s from run_attack
+        raise
     except Exception as e:
         logger.error(f"Attack error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Attack failed: {str(e)}")
+
+class AttackSession:
+    """
+    State for one /ws/session connection.
+
+    The image is uploaded and preprocessed once. Each predict/attack message
+    supersedes the previous one: its cancel flag is set, which stops iterative
+    attacks at their next step, and results for superseded requests are
+    reported as cancelled instead of sent.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.input_tensor = None
+        self.cancel_event = None
+        self.tasks = set()
+        self.send_lock = asyncio.Lock()
+        self.closed = False
+
+    async def send(self, message):
+        # Results of requests still running when the client went away are dropped
+        if self.closed:
+            return
+        async with self.send_lock:
+            try:
+                await self.websocket.send_json(message)
+            except (WebSocketDisconnect, RuntimeError):
+                self.closed = True
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    async def upload(self, image_bytes):
+        self.cancel()
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        self.input_tensor = await run_in_threadpool(preprocess_image, image)
+        await self.send({"type": "uploaded", "shape": list(self.input_tensor.shape)})
+
+    def submit(self, message):
+        self.cancel()
+        self.cancel_event = threading.Event()
+        task = asyncio.create_task(self.run(message, self.input_tensor, self.cancel_event))
+        # Keep a reference so the task is not garbage collected while running
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, message, input_tensor, cancel_event):
+        request_id = message.get("id")
+        try:
+            data = await run_in_threadpool(self.compute, message, input_tensor, cancel_event.is_set)
+        except AttackCancelled:
+            data = None
+        except HTTPException as e:
+            await self.send({"type": "error", "id": request_id, "detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Session request failed: {str(e)}")
+            await self.send({"type": "error", "id": request_id, "detail": str(e)})
+            return
+
+        # Non-iterative work cannot be interrupted, so drop results that were superseded meanwhile
+        if data is None or cancel_event.is_set():
+            await self.send({"type": "cancelled", "id": request_id})
+        else:
+            await self.send({"type": "result", "id": request_id, "kind": message["type"], "data": data})
+
+    def compute(self, message, input_tensor, should_stop):
+        model_name = message.get("model_name")
+        if model_name not in SERVED_MODELS:
+            raise HTTPException(status_code=400, detail="Invalid model name")
+        if input_tensor is None:
+            raise HTTPException(status_code=400, detail="No image uploaded")
+
+        if message["type"] == "predict":
+            return get_top5_predictions(get_model(model_name), input_tensor)
+
+        attack_type = message.get("attack_type")
+        if attack_type not in ATTACK_TYPES:
+            raise HTTPException(status_code=400, detail="Invalid attack type")
+        params = {
+            name: type(default)(message[name])
+            for name, default in ATTACK_DEFAULTS.items() if name in message
+        }
+        # Some attacks set requires_grad on their input, so keep the session copy clean
+        return run_attack(model_name, input_tensor.clone(), attack_type, should_stop=should_stop, **params)
+
+@app.websocket("/ws/session")
+async def session(websocket: WebSocket):
+    """
+    Interactive session.
+
+    Send the image once as a binary frame, then JSON messages such as
+    {"type": "predict", "id": 1, "model_name": "ResNet18"} or
+    {"type": "attack", "id": 2, "model_name": "ResNet18", "attack_type": "PGD", "steps": 20}.
+    Replies are {"type": "uploaded"}, {"type": "result", "id", "kind", "data"},
+    {"type": "cancelled", "id"} or {"type": "error", "id", "detail"}.
+    """
+    await websocket.accept()
+    attack_session = AttackSession(websocket)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                try:
+                    await attack_session.upload(message["bytes"])
+                except Exception as e:
+                    logger.error(f"Session upload failed: {str(e)}")
+                    await attack_session.send({"type": "error", "id": None, "detail": f"Upload failed: {str(e)}"})
+                continue
+
+            try:
+                request = json.loads(message["text"])
+            except ValueError:
+                await attack_session.send({"type": "error", "id": None, "detail": "Invalid JSON message"})
+                continue
+            if request.get("type") in ("predict", "attack"):
+                attack_session.submit(request)
+            elif request.get("type") == "cancel":
+                attack_session.cancel()
+            else:
+                await attack_session.send({"type": "error", "id": request.get("id"), "detail": "Unknown message type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        attack_session.closed = True
+        attack_session.cancel()
@@ -0,0 +1,75 @@
+"""
+On-disk library of precomputed universal perturbations and adversarial patches.
+
+Entries live next to the torchvision model cache populated by
+`download_models.py`, under the torch hub directory (`~/.cache/torch/hub`
+unless TORCH_HOME is set):
+
+    <hub_dir>/perturbations/v1/<model_name>/<kind>.pt
+
+and are produced offline by `train_universal.py`.
+"""
+
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import torch
+
+LIBRARY_VERSION = 1
+KINDS = ("universal", "patch")
+
+
+def hub_dir():
+    """Torch hub directory; model weights live in its `checkpoints` folder."""
+    return Path(torch.hub.get_dir())
+
+
+def library_dir(version=LIBRARY_VERSION):
+    return hub_dir() / "perturbations" / f"v{version}"
+
+
+def perturbation_path(model_name, kind, version=LIBRARY_VERSION):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown perturbation kind: {kind}")
+    return library_dir(version) / model_name / f"{kind}.pt"
+
+
+def save_perturbation(model_name, kind, tensor, **meta):
+    path = perturbation_path(model_name, kind)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a running server never loads a half-written file
+    tmp_path = path.with_suffix(".tmp")
+    torch.save({
+        "version": LIBRARY_VERSION,
+        "model": model_name,
+        "kind": kind,
+        "tensor": tensor.detach().cpu(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "meta": meta,
+    }, tmp_path)
+    tmp_path.replace(path)
+    return path
+
+
+def load_entry(model_name, kind):
+    path = perturbation_path(model_name, kind)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No {kind} perturbation for {model_name} at {path}. "
+            f"Run: python train_universal.py --images <dir> --models {model_name}"
+        )
+    # Keyed on mtime so entries rewritten by train_universal.py are picked up without a restart
+    return _load_file(str(path), path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=16)
+def _load_file(path, mtime_ns):
+    entry = torch.load(path, map_location="cpu")
+    if entry.get("version") != LIBRARY_VERSION:
+        raise ValueError(f"{path} has library version {entry.get('version')}, expected {LIBRARY_VERSION}")
+    return entry
+
+
+def load_perturbation(model_name, kind):
+    return load_entry(model_name, kind)["tensor"]
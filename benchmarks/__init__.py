@@ -0,0 +1,13 @@
+"""
+Load-testing and latency-regression benchmarks for the Adversarial Attacks API.
+
+    python -m benchmarks load --out results/load.json
+    python -m benchmarks micro --out results/micro.json
+    python -m benchmarks compare baseline.json results/load.json
+
+`benchmarks.micro` imports torch and the backend, so it is not imported here.
+"""
+
+from .stats import summarize, percentile
+from .load import ASGITransport, HTTPTransport, Scenario, parse_mix, run_load
+from .baseline import save_results, load_results, compare_results
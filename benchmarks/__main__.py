@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import io
+import sys
+
+import numpy as np
+from PIL import Image
+
+from .baseline import save_results, load_results, compare_results, format_comparison
+from .load import ASGITransport, HTTPTransport, parse_mix, run_load
+
+DEFAULT_MIX = (
+    "predict:ResNet18*4,"
+    "attack:ResNet18:FGSM*2,"
+    "attack:ResNet18:PGD:steps=10,"
+    "attack:ResNet18:PGD:steps=10:restarts=4,"
+    "attack:ResNet18:GaussianBlur,"
+    "attack:ResNet18:SaltPepper,"
+    "attack:ResNet18:Patch"
+)
+
+
+def load_image(path):
+    if path:
+        return Image.open(path).convert("RGB")
+    # Deterministic synthetic image so runs are comparable without a fixture
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (320, 320, 3), dtype=np.uint8))
+
+
+def image_bytes(image):
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def cmd_load(args):
+    scenarios = parse_mix(args.mix)
+    if args.url:
+        transport = HTTPTransport(args.url)
+    else:
+        from backend.main import app
+        transport = ASGITransport(app)
+
+    results = asyncio.run(run_load(
+        transport,
+        image_bytes(load_image(args.image)),
+        scenarios,
+        concurrency=args.concurrency,
+        total_requests=args.requests,
+        warmup=args.warmup,
+        seed=args.seed,
+    ))
+    config = {
+        "mode": "http" if args.url else "inprocess",
+        "url": args.url,
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "warmup": args.warmup,
+    }
+    return "load", results, config
+
+
+def cmd_micro(args):
+    from .micro import run_micro, torch_info
+
+    results = run_micro(
+        load_image(args.image),
+        model_name=args.model,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        only=args.only,
+    )
+    config = {"model": args.model, "repeat": args.repeat, "warmup": args.warmup}
+    config.update(torch_info())
+    return "micro", results, config
+
+
+def print_results(results):
+    print(f"{'key':40} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for key, r in results.items():
+        fmt = lambda v: f"{v:9.2f}" if v is not None else f"{'-':>9}"
+        rps = r.get("throughput_rps")
+        rps_str = f"{rps:8.2f}" if rps is not None else f"{'-':>8}"
+        print(f"{key:40} {r['count']:6d} {r['errors']:4d} "
+              f"{fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])} {rps_str}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Adversarial Attacks API benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="Load test /predict/ and /attack/")
+    load.add_argument("--url", default=None,
+                      help="Server to hit, e.g. http://localhost:8000 (default: in-process app)")
+    load.add_argument("--mix", default=DEFAULT_MIX,
+                      help="Comma separated endpoint:model[:attack[:k=v...]][*weight] entries")
+    load.add_argument("--concurrency", type=int, default=4)
+    load.add_argument("--requests", type=int, default=100)
+    load.add_argument("--warmup", type=int, default=5)
+    load.add_argument("--seed", type=int, default=0)
+
+    micro = sub.add_parser("micro", help="Micro-benchmark preprocessing, attacks and encoding")
+    micro.add_argument("--model", default="ResNet18")
+    micro.add_argument("--repeat", type=int, default=20)
+    micro.add_argument("--warmup", type=int, default=2)
+    micro.add_argument("--only", nargs="*", default=None,
+                       help="Restrict to names such as preprocess_image or attack/pgd")
+
+    for p in (load, micro):
+        p.add_argument("--image", default=None, help="Input image (default: synthetic 320x320)")
+        p.add_argument("--out", default=None, help="Write results to this JSON file")
+        p.add_argument("--baseline", default=None, help="Compare against this baseline JSON")
+        p.add_argument("--threshold", type=float, default=0.10,
+                       help="Relative change that counts as a regression")
+
+    compare = sub.add_parser("compare", help="Compare two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        baseline, current = load_results(args.baseline), load_results(args.current)
+    else:
+        kind, results, config = cmd_load(args) if args.command == "load" else cmd_micro(args)
+        print_results(results)
+        if args.out:
+            current = save_results(args.out, kind, results, config)
+            print(f"\nResults written to {args.out}")
+        else:
+            current = {"kind": kind, "results": results}
+        if not args.baseline:
+            return 0
+        baseline = load_results(args.baseline)
+
+    if baseline.get("kind") != current.get("kind"):
+        print(f"Cannot compare {baseline.get('kind')} results with {current.get('kind')} results")
+        return 2
+    rows = compare_results(baseline, current, args.threshold)
+    print()
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
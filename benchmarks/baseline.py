@@ -0,0 +1,76 @@
+"""
+JSON baselines and regression comparison for benchmark results.
+"""
+
+import json
+import platform
+import time
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def save_results(path, kind, results, config=None, extra=None):
+    data = {
+        "kind": kind,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config or {},
+        "results": results,
+    }
+    if extra:
+        data.update(extra)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True))
+    return data
+
+
+def load_results(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    Compare two result files entry by entry.
+
+    A latency percentile that grew, or a throughput that dropped, by more than
+    `threshold` (a fraction) counts as a regression. A baseline key missing
+    from the current run also counts as a regression, so a renamed scenario
+    cannot silently pass; keys only in the current run are listed as "new".
+    Returns a list of rows (key, metric, baseline, current, change, regressed).
+    """
+    rows = []
+    base_results = baseline["results"]
+    cur_results = current["results"]
+    for key in sorted(set(base_results) - set(cur_results)):
+        rows.append((key, "missing", None, None, None, True))
+    for key, cur in sorted(cur_results.items()):
+        base = base_results.get(key)
+        if base is None:
+            rows.append((key, "new", None, None, None, False))
+            continue
+        for metric in METRICS:
+            if base.get(metric) is None or cur.get(metric) is None:
+                continue
+            change = (cur[metric] - base[metric]) / base[metric]
+            rows.append((key, metric, base[metric], cur[metric], change, change > threshold))
+        if base.get("throughput_rps") and cur.get("throughput_rps") is not None:
+            change = (cur["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"]
+            rows.append((key, "throughput_rps", base["throughput_rps"], cur["throughput_rps"],
+                         change, change < -threshold))
+        if cur.get("errors", 0) > base.get("errors", 0):
+            rows.append((key, "errors", base.get("errors", 0), cur["errors"], None, True))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'key':40} {'metric':15} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for key, metric, base, cur, change, regressed in rows:
+        change_str = f"{change:+.1%}" if change is not None else ""
+        base_str = f"{base:10.2f}" if base is not None else f"{'-':>10}"
+        cur_str = f"{cur:10.2f}" if cur is not None else f"{'-':>10}"
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{key:40} {metric:15} {base_str} {cur_str} {change_str:>8}{flag}")
+    return "\n".join(lines)
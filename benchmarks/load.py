@@ -0,0 +1,223 @@
+"""
+Asyncio load generator for `/predict/` and `/attack/`.
+
+Requests are sent either straight into the ASGI app (no server, no sockets)
+or over HTTP to a running server. Neither transport needs a third-party HTTP
+client.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from .stats import summarize
+
+
+@dataclass
+class Scenario:
+    """One kind of request in the load mix."""
+    endpoint: str                      # "predict" or "attack"
+    model_name: str
+    attack_type: Optional[str] = None
+    params: Dict[str, str] = field(default_factory=dict)
+    weight: float = 1.0
+
+    @property
+    def key(self):
+        parts = [self.endpoint, self.model_name]
+        if self.attack_type:
+            parts.append(self.attack_type)
+        key = "/".join(parts)
+        if self.params:
+            key += "[" + ",".join(f"{k}={v}" for k, v in sorted(self.params.items())) + "]"
+        return key
+
+    def fields(self):
+        fields = {"model_name": self.model_name}
+        if self.attack_type:
+            fields["attack_type"] = self.attack_type
+        fields.update({k: str(v) for k, v in self.params.items()})
+        return fields
+
+
+def parse_mix(spec):
+    """
+    Parse a comma separated mix such as
+    "predict:ResNet18*3,attack:ResNet18:FGSM,attack:ResNet18:PGD:steps=5".
+
+    Each entry is endpoint:model[:attack[:key=value...]] with an optional
+    "*weight" suffix.
+    """
+    scenarios = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        weight = 1.0
+        if "*" in entry:
+            entry, weight = entry.rsplit("*", 1)
+            weight = float(weight)
+        parts = entry.split(":")
+        endpoint, model_name = parts[0], parts[1]
+        attack_type = parts[2] if len(parts) > 2 else None
+        params = dict(p.split("=", 1) for p in parts[3:])
+        if endpoint not in ("predict", "attack"):
+            raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+        if endpoint == "attack" and not attack_type:
+            raise ValueError(f"Attack entry needs an attack type: {entry}")
+        scenarios.append(Scenario(endpoint, model_name, attack_type, params, weight))
+    return scenarios
+
+
+def encode_multipart(fields, file_bytes, filename="image.png"):
+    """Encode form fields and an image as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    lines = []
+    for name, value in fields.items():
+        lines.append(f"--{boundary}\r\n".encode())
+        lines.append(f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+        lines.append(f"{value}\r\n".encode())
+    lines.append(f"--{boundary}\r\n".encode())
+    lines.append(f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode())
+    lines.append(b"Content-Type: image/png\r\n\r\n")
+    lines.append(file_bytes)
+    lines.append(f"\r\n--{boundary}--\r\n".encode())
+    return b"".join(lines), f"multipart/form-data; boundary={boundary}"
+
+
+class ASGITransport:
+    """Calls an ASGI app in-process."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def post(self, path, body, content_type):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"benchmark"),
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+        sent = False
+        status = None
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.app(scope, receive, send)
+        return status
+
+    async def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Minimal HTTP/1.1 client over asyncio streams, one connection per request."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+
+    async def post(self, path, body, content_type):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = (
+                f"POST {self.prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode() + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            parts = status_line.split()
+            # An empty or garbled reply has no status code; the caller counts it as an error
+            if len(parts) < 2 or not parts[1].isdigit():
+                return None
+            return int(parts[1])
+        finally:
+            writer.close()
+
+    async def close(self):
+        pass
+
+
+async def run_load(transport, image_bytes, scenarios, concurrency=4, total_requests=100,
+                   warmup=0, seed=0):
+    """
+    Drive `transport` with `total_requests` requests drawn from `scenarios`.
+
+    `concurrency` coroutines issue requests back to back. The first `warmup`
+    requests are sent but not recorded (model loading, label download).
+    Returns per-scenario latency summaries plus an "all" entry.
+    """
+    rng = random.Random(seed)
+    weights = [s.weight for s in scenarios]
+    plan = rng.choices(scenarios, weights=weights, k=warmup + total_requests)
+    payloads = {}
+    for scenario in scenarios:
+        payloads[scenario.key] = encode_multipart(scenario.fields(), image_bytes)
+
+    for scenario in plan[:warmup]:
+        body, content_type = payloads[scenario.key]
+        await transport.post(f"/{scenario.endpoint}/", body, content_type)
+
+    queue = list(reversed(plan[warmup:]))
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def worker():
+        while queue:
+            scenario = queue.pop()
+            body, content_type = payloads[scenario.key]
+            start = time.perf_counter()
+            try:
+                status = await transport.post(f"/{scenario.endpoint}/", body, content_type)
+            except (OSError, asyncio.IncompleteReadError):
+                status = None
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                latencies[scenario.key].append(elapsed)
+            else:
+                errors[scenario.key] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - start
+
+    results = {}
+    for key in sorted(set(latencies) | set(errors)):
+        results[key] = summarize(latencies[key], errors[key], wall_time)
+    all_latencies = [v for values in latencies.values() for v in values]
+    results["all"] = summarize(all_latencies, sum(errors.values()), wall_time)
+    return results
@@ -0,0 +1,74 @@
+"""
+Micro-benchmarks for the per-request building blocks: `preprocess_image`,
+every attack in `backend.attacks` and `image_to_base64`.
+"""
+
+import time
+
+import torch
+
+from backend import attacks
+from backend.models import get_model
+from backend.utils import preprocess_image, image_to_base64
+
+from .stats import summarize
+
+
+def attack_cases(model):
+    """Attack name -> callable taking a preprocessed input tensor."""
+    return {
+        "fgsm": lambda x: attacks.fgsm(model, x, 0.03),
+        "pgd": lambda x: attacks.pgd(model, x, 0.03, 10),
+        "pgd_restarts4": lambda x: attacks.pgd(model, x, 0.03, 10, restarts=4),
+        "blur": lambda x: attacks.blur(x, 5),
+        "sp_noise": lambda x: attacks.sp_noise(x, 0.05),
+        "patch": lambda x: attacks.patch(x),
+        "simba": lambda x: attacks.simba(model, x, 0.05, 500, 100),
+        "random_search": lambda x: attacks.random_search(model, x, 0.05, 500, 100),
+        # Library perturbations are replaced by same-shaped stand-ins so the
+        # benchmark does not depend on train_universal.py having been run
+        "universal": lambda x: attacks.universal(x, torch.zeros_like(x)),
+        "learned_patch": lambda x: attacks.learned_patch(x, torch.rand(3, 50, 50)),
+    }
+
+
+def time_call(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def run_micro(image, model_name="ResNet18", repeat=20, warmup=2, only=None):
+    """
+    Time each building block on `image` (a PIL RGB image).
+
+    `only` optionally restricts the run to names such as "preprocess_image"
+    or "attack/pgd".
+    """
+    model = get_model(model_name)
+    input_tensor = preprocess_image(image)
+    adv_image = image.resize((224, 224))
+
+    cases = {
+        "preprocess_image": lambda: preprocess_image(image),
+        "image_to_base64": lambda: image_to_base64(adv_image),
+    }
+    for name, attack in attack_cases(model).items():
+        # Attacks may set requires_grad on their input, so give each call a fresh copy
+        cases[f"attack/{name}"] = lambda attack=attack: attack(input_tensor.clone())
+
+    results = {}
+    for name, fn in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = time_call(fn, repeat, warmup)
+    return results
+
+
+def torch_info():
+    return {"torch": torch.__version__, "threads": torch.get_num_threads()}
@@ -0,0 +1,32 @@
+import math
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0-100)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, errors=0, wall_time=None):
+    """
+    Summarize latencies (seconds) as milliseconds.
+
+    Throughput is only reported when the wall-clock time of the run is known.
+    """
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": sum(values) / len(values) * 1000 if values else None,
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None,
+    }
+    for q in (50, 95, 99):
+        value = percentile(values, q)
+        summary[f"p{q}_ms"] = value * 1000 if value is not None else None
+    if wall_time:
+        summary["throughput_rps"] = len(values) / wall_time
+    return summary
@@ -10,7 +10,8 @@ import torch
 import torchvision.models as models
 import os
 import sys
-from pathlib import Path
+
+from backend.perturbations import hub_dir
 
 def download_model(model_name, model_func):
     """Download and cache a specific model."""
@@ -41,7 +42,7 @@ def main():
     total_models = len(models_to_download)
     
     # Create cache directory if it doesn't exist
-    cache_dir = Path.home() / ".cache" / "torch" / "hub" / "checkpoints"
+    cache_dir = hub_dir() / "checkpoints"
     cache_dir.mkdir(parents=True, exist_ok=True)
     print(f"📁 Models will be cached in: {cache_dir}\n")
     
@@ -1,10 +1,13 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import hashlib
+import uuid
 from PIL import Image
 import io
 import numpy as np
-import matplotlib.pyplot as plt
+from session_client import SessionPool, SessionError, SessionSuperseded, SessionUnavailable
 
 # Configure page layout
 st.set_page_config(
@@ -15,6 +18,85 @@ st.set_page_config(
 )
 
 API_URL = "http://localhost:8000"
+WS_URL = API_URL.replace("http", "ws", 1) + "/ws/session"
+
+@st.cache_resource
+def get_session_pool():
+    # Shared across reruns and browser sessions; one persistent connection per session
+    return SessionPool(WS_URL)
+
+@st.cache_resource
+def get_http_session():
+    # Keep-alive connections reused across reruns for the HTTP fallback
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def backend_call(kind, image_bytes, image_hash, data):
+    """
+    Run a "predict" or "attack" request over the persistent session WebSocket,
+    falling back to a plain HTTP request if the WebSocket cannot be opened
+    (e.g. behind the gateway). Once the request is sent it is never retried,
+    so a slow attack is not run twice.
+    """
+    try:
+        session = get_session_pool().get(st.session_state.session_id)
+        return session.request(kind, image_bytes, image_hash, **data)
+    except SessionUnavailable:
+        pass
+    resp = get_http_session().post(f"{API_URL}/{kind}/", files={"file": image_bytes}, data=data)
+    if resp.status_code != 200:
+        raise SessionError(f"status {resp.status_code}: {resp.text}")
+    return resp.json()
+
+# Attacks whose output is random, so each "Launch Attack" click must reach the backend
+RANDOM_ATTACKS = ["Patch", "SaltPepper", "LearnedPatch", "SimBA", "RandomSearch"]
+
+def is_random_attack(attack_type, restarts):
+    return attack_type in RANDOM_ATTACKS or (attack_type == "PGD" and restarts > 1)
+
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def cached_backend_call(kind, image_hash, data_items, _image_bytes):
+    """
+    Memoized backend_call keyed by image hash and request parameters, so
+    reruns caused by unrelated widgets do not hit the backend again. The image
+    bytes are excluded from the cache key (leading underscore). Only for
+    deterministic requests; random attacks call backend_call directly.
+    """
+    return backend_call(kind, _image_bytes, image_hash, dict(data_items))
+
+def prediction_chart_spec(preds, title, color):
+    """Vega-Lite horizontal bar chart of the top-5 predictions."""
+    values = [
+        {"class": p["class"][:15] + "..." if len(p["class"]) > 15 else p["class"], "probability": p["probability"]}
+        for p in preds[:5]
+    ]
+    y = {"field": "class", "type": "nominal", "sort": "-x", "title": None}
+    return {
+        "title": title,
+        "data": {"values": values},
+        "height": 240,
+        "layer": [
+            {
+                "mark": {"type": "bar", "color": color, "opacity": 0.8},
+                "encoding": {
+                    "y": y,
+                    "x": {"field": "probability", "type": "quantitative", "title": "Probability",
+                          "scale": {"domain": [0, 1]}},
+                },
+            },
+            {
+                "mark": {"type": "text", "align": "left", "dx": 4},
+                "encoding": {
+                    "y": y,
+                    "x": {"field": "probability", "type": "quantitative"},
+                    "text": {"field": "probability", "type": "quantitative", "format": ".3f"},
+                },
+            },
+        ],
+    }
 
 # Custom CSS for better UI
 st.markdown("""
@@ -56,6 +138,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Session state for reset functionality
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "reset" not in st.session_state:
     st.session_state.reset = False
 if "uploaded_file" not in st.session_state:
@@ -68,10 +152,14 @@ if "epsilon" not in st.session_state:
     st.session_state.epsilon = 0.03
 if "steps" not in st.session_state:
     st.session_state.steps = 10
+if "restarts" not in st.session_state:
+    st.session_state.restarts = 1
 if "kernel_size" not in st.session_state:
     st.session_state.kernel_size = 3
 if "noise_level" not in st.session_state:
     st.session_state.noise_level = 0.05
+if "max_queries" not in st.session_state:
+    st.session_state.max_queries = 1000
 
 
 st.title("🛡️ Adversarial Attacks on Pretrained CV Models")
@@ -95,8 +183,8 @@ with st.sidebar:
     st.subheader("⚔️ Attack Type")
     attack_type = st.selectbox(
         "Choose Attack", 
-        ["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch"], 
-        index=["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch"].index(st.session_state.attack_type),
+        ["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch", "Universal", "LearnedPatch", "SimBA", "RandomSearch"], 
+        index=["FGSM", "PGD", "GaussianBlur", "SaltPepper", "Patch", "Universal", "LearnedPatch", "SimBA", "RandomSearch"].index(st.session_state.attack_type),
         help="Select the type of adversarial attack",
         key="attack_selectbox"
     )
@@ -105,7 +193,7 @@ with st.sidebar:
     st.subheader("🔧 Parameters")
     
     # Show relevant parameters based on attack type
-    if attack_type in ["FGSM", "PGD"]:
+    if attack_type in ["FGSM", "PGD", "SimBA", "RandomSearch"]:
         epsilon = st.slider(
             "Epsilon", 
             0.0, 0.3, st.session_state.epsilon, 
@@ -122,8 +210,15 @@ with st.sidebar:
             key="steps_slider",
             help="Number of PGD iterations"
         )
+        restarts = st.slider(
+            "Restarts", 
+            1, 10, st.session_state.restarts, 
+            key="restarts_slider",
+            help="Random restarts, run together in one batch"
+        )
     else:
         steps = st.session_state.steps
+        restarts = st.session_state.restarts
         
     if attack_type == "GaussianBlur":
         kernel_size = st.slider(
@@ -144,13 +239,24 @@ with st.sidebar:
         )
     else:
         noise_level = st.session_state.noise_level
+
+    if attack_type in ["SimBA", "RandomSearch"]:
+        max_queries = st.slider(
+            "Query Budget", 
+            100, 10000, st.session_state.max_queries, 
+            step=100,
+            key="queries_slider",
+            help="Maximum number of model queries for the black-box attack"
+        )
+    else:
+        max_queries = st.session_state.max_queries
     
     st.markdown("---")
     
     # Reset button
     if st.button("🔄 Reset All", help="Reset to default values"):
         # Clear all session state keys that need to be reset
-        for key in ["model_selectbox", "attack_selectbox", "epsilon_slider", "steps_slider", "kernel_slider", "noise_slider"]:
+        for key in ["model_selectbox", "attack_selectbox", "epsilon_slider", "steps_slider", "restarts_slider", "kernel_slider", "noise_slider", "queries_slider"]:
             if key in st.session_state:
                 del st.session_state[key]
         
@@ -160,8 +266,10 @@ with st.sidebar:
         st.session_state.attack_type = "FGSM"
         st.session_state.epsilon = 0.03
         st.session_state.steps = 10
+        st.session_state.restarts = 1
         st.session_state.kernel_size = 3
         st.session_state.noise_level = 0.05
+        st.session_state.max_queries = 1000
         st.rerun()
 
 # Main content area
@@ -180,15 +288,17 @@ with col1:
 if uploaded_file:
     # Get original predictions first
     image = Image.open(uploaded_file).convert("RGB")
+    image_bytes = uploaded_file.getvalue()
+    image_hash = hashlib.sha1(image_bytes).hexdigest()
     with st.spinner("🔍 Getting predictions..."):
-        buf = io.BytesIO()
-        image.save(buf, format="PNG")
-        buf.seek(0)
-        files = {"file": buf}
         predict_data = {"model_name": model_name}
         try:
-            pred_resp = requests.post(f"{API_URL}/predict/", files=files, data=predict_data)
-            orig_preds = pred_resp.json()
+            orig_preds = cached_backend_call("predict", image_hash, tuple(sorted(predict_data.items())), image_bytes)
+        except SessionSuperseded:
+            st.stop()
+        except SessionError as e:
+            st.error(f"❌ Prediction failed: {e}")
+            st.stop()
         except requests.exceptions.RequestException:
             st.error("❌ Cannot connect to backend API. Make sure the FastAPI server is running.")
             st.stop()
@@ -202,9 +312,11 @@ if uploaded_file:
     - Attack: {attack_type}
     - Parameters: {
         f"ε={epsilon}" if attack_type in ["FGSM", "PGD"] else
+        f"ε={epsilon}, Queries≤{max_queries}" if attack_type in ["SimBA", "RandomSearch"] else
         f"Steps={steps}" if attack_type == "PGD" else
         f"Kernel={kernel_size}" if attack_type == "GaussianBlur" else
         f"Noise={noise_level}" if attack_type == "SaltPepper" else
+        "Precomputed perturbation" if attack_type in ["Universal", "LearnedPatch"] else
         "Default patch"
     }
     """)
@@ -246,108 +358,90 @@ if uploaded_file:
                 "attack_type": attack_type,
                 "epsilon": epsilon,
                 "steps": steps,
+                "restarts": restarts,
                 "kernel_size": kernel_size,
-                "noise_level": noise_level
+                "noise_level": noise_level,
+                "max_queries": max_queries
             }
-            buf.seek(0)
-            files = {"file": buf}
-            
             try:
-                attack_resp = requests.post(f"{API_URL}/attack/", files=files, data=attack_data)
+                if is_random_attack(attack_type, restarts):
+                    # Every click draws a new sample, so caching would only evict reusable entries
+                    result = backend_call("attack", image_bytes, image_hash, attack_data)
+                else:
+                    result = cached_backend_call("attack", image_hash, tuple(sorted(attack_data.items())), image_bytes)
                 
-                # Check if request was successful
-                if attack_resp.status_code != 200:
-                    st.error(f"❌ Attack failed with status {attack_resp.status_code}: {attack_resp.text}")
+                # Check if response contains error
+                if "error" in result:
+                    st.error(f"❌ Attack failed: {result['error']}")
+                elif "adv_image" not in result:
+                    st.error(f"❌ Attack response missing adversarial image. Response keys: {list(result.keys())}")
                 else:
-                    result = attack_resp.json()
-                    
-                    # Check if response contains error
-                    if "error" in result:
-                        st.error(f"❌ Attack failed: {result['error']}")
-                    elif "adv_image" not in result:
-                        st.error(f"❌ Attack response missing adversarial image. Response keys: {list(result.keys())}")
-                    else:
-                        # Success - process the results
-                        # Update adversarial image placeholder
-                        adv_image_b64 = result["adv_image"]
-                        adv_image = Image.open(io.BytesIO(base64.b64decode(adv_image_b64)))
-                        with adv_placeholder.container():
-                            st.image(adv_image, caption="⚔️ Adversarial Image", use_container_width=True)
-                        
-                        # Update adversarial predictions placeholder
-                        adv_preds = result["adversarial"]
-                        with adv_pred_placeholder.container():
-                            st.markdown("**Adversarial Predictions**")
-                            for i, pred in enumerate(adv_preds[:3]):  # Show top 3
-                                st.markdown(f"**{i+1}.** {pred['class']}")
-                                st.progress(pred['probability'])
-                                st.caption(f"Confidence: {pred['probability']:.3f}")
-                    
-                    # Analysis section
-                    st.markdown("---")
-                    st.subheader("📊 Detailed Analysis")
+                    # Success - process the results
+                    # Update adversarial image placeholder
+                    adv_image_b64 = result["adv_image"]
+                    adv_image = Image.open(io.BytesIO(base64.b64decode(adv_image_b64)))
+                    with adv_placeholder.container():
+                        st.image(adv_image, caption="⚔️ Adversarial Image", use_container_width=True)
                     
-                    # Create comparison chart
-                    chart_col1, chart_col2 = st.columns(2)
-                    
-                    with chart_col1:
-                        st.markdown("**Original Predictions Chart**")
-                        orig_classes = [p["class"][:15] + "..." if len(p["class"]) > 15 else p["class"] for p in orig_preds[:5]]
-                        orig_probs = [p["probability"] for p in orig_preds[:5]]
-                        
-                        fig1, ax1 = plt.subplots(figsize=(8, 6))
-                        bars1 = ax1.barh(orig_classes, orig_probs, color='#4ECDC4', alpha=0.8)
-                        ax1.set_xlabel("Probability")
-                        ax1.set_title("Original")
-                        ax1.set_xlim(0, 1)
-                        
-                        # Add value labels on bars
-                        for bar, prob in zip(bars1, orig_probs):
-                            ax1.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2, 
-                                    f'{prob:.3f}', ha='left', va='center')
-                        
-                        plt.tight_layout()
-                        st.pyplot(fig1)
-                    
-                    with chart_col2:
-                        st.markdown("**Adversarial Predictions Chart**")
-                        adv_classes = [p["class"][:15] + "..." if len(p["class"]) > 15 else p["class"] for p in adv_preds[:5]]
-                        adv_probs = [p["probability"] for p in adv_preds[:5]]
-                        
-                        fig2, ax2 = plt.subplots(figsize=(8, 6))
-                        bars2 = ax2.barh(adv_classes, adv_probs, color='#FF6B6B', alpha=0.8)
-                        ax2.set_xlabel("Probability")
-                        ax2.set_title("Adversarial")
-                        ax2.set_xlim(0, 1)
-                        
-                        # Add value labels on bars
-                        for bar, prob in zip(bars2, adv_probs):
-                            ax2.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2, 
-                                    f'{prob:.3f}', ha='left', va='center')
-                        
-                        plt.tight_layout()
-                        st.pyplot(fig2)
-                    
-                    # Attack success metrics
-                    st.markdown("---")
-                    st.subheader("📈 Attack Analysis")
-                    
-                    col_metric1, col_metric2, col_metric3 = st.columns(3)
-                    
-                    with col_metric1:
-                        orig_top1 = orig_preds[0]["class"]
-                        adv_top1 = adv_preds[0]["class"]
-                        success = "✅ Success" if orig_top1 != adv_top1 else "❌ Failed"
-                        st.metric("Attack Status", success)
-                    
-                    with col_metric2:
-                        conf_drop = orig_preds[0]["probability"] - adv_preds[0]["probability"]
-                        st.metric("Confidence Drop", f"{conf_drop:.3f}")
+                    # Update adversarial predictions placeholder
+                    adv_preds = result["adversarial"]
+                    with adv_pred_placeholder.container():
+                        st.markdown("**Adversarial Predictions**")
+                        for i, pred in enumerate(adv_preds[:3]):  # Show top 3
+                            st.markdown(f"**{i+1}.** {pred['class']}")
+                            st.progress(pred['probability'])
+                            st.caption(f"Confidence: {pred['probability']:.3f}")
+                
+                # Analysis section
+                st.markdown("---")
+                st.subheader("📊 Detailed Analysis")
+                
+                # Create comparison chart
+                chart_col1, chart_col2 = st.columns(2)
+                
+                with chart_col1:
+                    st.markdown("**Original Predictions Chart**")
+                    st.vega_lite_chart(prediction_chart_spec(orig_preds, "Original", "#4ECDC4"), use_container_width=True)
+                
+                with chart_col2:
+                    st.markdown("**Adversarial Predictions Chart**")
+                    st.vega_lite_chart(prediction_chart_spec(adv_preds, "Adversarial", "#FF6B6B"), use_container_width=True)
+                
+                # Attack success metrics
+                st.markdown("---")
+                st.subheader("📈 Attack Analysis")
+                
+                col_metric1, col_metric2, col_metric3 = st.columns(3)
+                
+                with col_metric1:
+                    orig_top1 = orig_preds[0]["class"]
+                    adv_top1 = adv_preds[0]["class"]
+                    success = "✅ Success" if orig_top1 != adv_top1 else "❌ Failed"
+                    st.metric("Attack Status", success)
+                
+                with col_metric2:
+                    conf_drop = orig_preds[0]["probability"] - adv_preds[0]["probability"]
+                    st.metric("Confidence Drop", f"{conf_drop:.3f}")
+                
+                with col_metric3:
+                    ranking_change = "Changed" if orig_top1 != adv_top1 else "Unchanged"
+                    st.metric("Top Prediction", ranking_change)
+
+                query_stats = result.get("attack_info", {}).get("queries")
+                if query_stats:
+                    q_col1, q_col2, q_col3 = st.columns(3)
+                    with q_col1:
+                        st.metric("Queries Used", query_stats["queries"])
+                    with q_col2:
+                        st.metric("Forward Passes", query_stats["forward_passes"])
+                    with q_col3:
+                        qps = query_stats.get("queries_per_sec")
+                        st.metric("Queries / s", f"{qps:.0f}" if qps is not None else "-")
                     
-                    with col_metric3:
-                        ranking_change = "Changed" if orig_top1 != adv_top1 else "Unchanged"
-                        st.metric("Top Prediction", ranking_change)
-                        
+            except SessionSuperseded:
+                st.stop()
+            except SessionError as e:
+                st.error(f"❌ Attack failed: {e}")
             except requests.exceptions.RequestException:
                 st.error("❌ Attack request failed. Check backend server.")
 
@@ -369,4 +463,7 @@ else:
     - **Gaussian Blur**: Simple image blurring
     - **Salt & Pepper**: Random noise injection
     - **Adversarial Patch**: Overlay attack patch
+    - **Universal**: Precomputed universal perturbation for the model
+    - **Learned Patch**: Precomputed optimized adversarial patch for the model
+    - **SimBA / Random Search**: Black-box attacks that only use model scores
     """)
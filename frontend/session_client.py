@@ -0,0 +1,155 @@
+"""
+Persistent WebSocket client for the backend `/ws/session` API.
+
+The image is uploaded once per session and only re-sent when it changes.
+Each request supersedes the previous one, both on the server (the in-flight
+attack is cancelled) and here (an older call still waiting for its reply
+gives up).
+"""
+
+import itertools
+import json
+import threading
+import time
+
+import websocket
+
+# Timeout for the handshake and for sends
+SOCKET_TIMEOUT = 10
+# recv() timeout while waiting, so a waiting call notices quickly when it is superseded
+POLL_INTERVAL = 0.25
+REQUEST_TIMEOUT = 300
+IDLE_TIMEOUT = 600
+# After a failed handshake (e.g. the gateway, which has no /ws/session), skip
+# the WebSocket for this long instead of failing a handshake on every call
+RETRY_INTERVAL = 60
+
+
+class SessionSuperseded(Exception):
+    """A newer request replaced this one before it finished."""
+
+
+class SessionError(Exception):
+    """The backend rejected or failed the request, or stopped answering it."""
+
+
+class SessionUnavailable(Exception):
+    """The WebSocket could not be used before the request was sent, so it is safe to retry elsewhere."""
+
+
+class BackendSession:
+    """One persistent connection to /ws/session."""
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.image_hash = None
+        self.ids = itertools.count(1)
+        self.latest_id = None
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.retry_at = 0.0
+
+    def connect(self):
+        if self.ws is None or not self.ws.connected:
+            if time.monotonic() < self.retry_at:
+                raise SessionUnavailable("Skipping the WebSocket after a recent failed handshake")
+            try:
+                self.ws = websocket.create_connection(self.url, timeout=SOCKET_TIMEOUT)
+            except (websocket.WebSocketException, OSError):
+                self.retry_at = time.monotonic() + RETRY_INTERVAL
+                raise
+            # A new connection is a new server-side session without an image
+            self.image_hash = None
+
+    def close(self):
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except (websocket.WebSocketException, OSError):
+                pass
+        self.ws = None
+        self.image_hash = None
+
+    def request(self, kind, image_bytes, image_hash, **params):
+        """
+        Send a "predict" or "attack" request and wait for its result.
+
+        Raises SessionSuperseded if a newer request is made meanwhile and
+        SessionError if the backend reports an error, does not reply within
+        REQUEST_TIMEOUT or drops the connection after the request was sent.
+        Connection problems before that are raised as SessionUnavailable.
+        """
+        request_id = next(self.ids)
+        # Set before taking the lock so an older call stuck in _wait gives up
+        self.latest_id = request_id
+        self.last_used = time.monotonic()
+        with self.lock:
+            if self.latest_id != request_id:
+                raise SessionSuperseded()
+            sent = False
+            try:
+                self.connect()
+                if self.image_hash != image_hash:
+                    self.ws.send_binary(image_bytes)
+                    reply = self._wait(request_id, lambda m: m["type"] == "uploaded" or m.get("id") is None)
+                    if reply["type"] == "error":
+                        raise SessionError(reply["detail"])
+                    self.image_hash = image_hash
+                self.ws.send(json.dumps({"type": kind, "id": request_id, **params}))
+                sent = True
+                reply = self._wait(request_id, lambda m: m.get("id") == request_id)
+            except (websocket.WebSocketException, OSError) as e:
+                self.close()
+                if not sent:
+                    raise SessionUnavailable(str(e)) from e
+                # The backend may already be running the request, so it must not be retried
+                raise SessionError(f"Connection lost: {str(e)}") from e
+
+        if reply["type"] == "cancelled":
+            raise SessionSuperseded()
+        if reply["type"] == "error":
+            raise SessionError(reply["detail"])
+        return reply["data"]
+
+    def _wait(self, request_id, match):
+        deadline = time.monotonic() + REQUEST_TIMEOUT
+        self.ws.settimeout(POLL_INTERVAL)
+        try:
+            while True:
+                if self.latest_id != request_id:
+                    raise SessionSuperseded()
+                try:
+                    raw = self.ws.recv()
+                except websocket.WebSocketTimeoutException:
+                    if time.monotonic() > deadline:
+                        # A late reply must not be read as the answer to a later request
+                        self.close()
+                        raise SessionError(f"No reply within {REQUEST_TIMEOUT} s")
+                    continue
+                message = json.loads(raw)
+                # Replies to superseded requests are skipped
+                if match(message):
+                    return message
+        finally:
+            if self.ws is not None:
+                self.ws.settimeout(SOCKET_TIMEOUT)
+
+
+class SessionPool:
+    """Keeps one BackendSession per browser session and closes idle ones."""
+
+    def __init__(self, url):
+        self.url = url
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            now = time.monotonic()
+            for idle_key in [k for k, s in self.sessions.items() if now - s.last_used > IDLE_TIMEOUT]:
+                if idle_key != key:
+                    self.sessions.pop(idle_key).close()
+            if key not in self.sessions:
+                self.sessions[key] = BackendSession(self.url)
+            return self.sessions[key]
@@ -0,0 +1,23 @@
+"""
+Stand-in for `backend.main:app` in gateway tests: answers health checks and
+echoes which worker process served a request, without loading any models.
+"""
+
+import os
+
+from fastapi import FastAPI, Request
+
+MODELS = os.environ.get("ADV_WORKER_MODELS", "").split(",")
+
+app = FastAPI()
+
+
+@app.get("/")
+async def root():
+    return {"message": "Adversarial Attacks API", "status": "running", "models": MODELS}
+
+
+@app.post("/predict/")
+async def predict(request: Request):
+    form = await request.form()
+    return {"model_name": form.get("model_name"), "models": MODELS, "pid": os.getpid()}
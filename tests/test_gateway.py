@@ -0,0 +1,117 @@
+"""
+Gateway topology, routing and crash recovery, run against stub workers.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import socket
+import time
+from pathlib import Path
+
+import pytest
+
+from backend import gateway
+from backend.gateway import WorkerPool, WorkerSpec, local_test_topology, plan_topology
+
+ROOT = Path(__file__).resolve().parent.parent
+STUB_APP = "tests.stub_worker:app"
+
+
+def free_port_pair():
+    """Return a base port such that it and the next port are both free."""
+    for _ in range(50):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        try:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", port + 1))
+            return port
+        except OSError:
+            continue
+    raise RuntimeError("No free port pair found")
+
+
+async def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condition not met in time")
+        await asyncio.sleep(0.1)
+
+
+def test_plan_topology_uses_every_core():
+    specs = plan_topology(models=["A", "B", "C"], cores=list(range(8)), base_port=9000)
+    assert [s.cores for s in specs] == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert [s.models for s in specs] == [["A"], ["B"], ["C"]]
+    assert [s.port for s in specs] == [9000, 9001, 9002]
+
+
+def test_plan_topology_shares_cores_when_short():
+    specs = plan_topology(models=["A", "B"], cores=[0], replicas=2)
+    assert [s.cores for s in specs] == [[0], [0], [0], [0]]
+    assert [s.models for s in specs] == [["A"], ["B"], ["A"], ["B"]]
+
+
+def test_pick_prefers_least_inflight():
+    pool = WorkerPool(plan_topology(models=["A"], cores=[0, 1], replicas=2, base_port=9000))
+    first, second = pool.workers
+    assert pool.pick("A") is None
+
+    first.ready = second.ready = True
+    first.inflight = 2
+    assert pool.pick("A") is second
+    second.inflight = 3
+    assert pool.pick("A") is first
+    # Ties go to the worker that has served fewer requests
+    first.inflight = second.inflight = 0
+    second.served = 1
+    assert pool.pick("A") is first
+    assert pool.pick("B") is None
+
+
+def test_local_topology_routes_and_restarts(monkeypatch):
+    # uvicorn resolves the stub app relative to the working directory
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(gateway, "HEALTH_INTERVAL", 0.1)
+    monkeypatch.setattr(gateway, "RESTART_BACKOFF", 0.5)
+    specs = local_test_topology(base_port=free_port_pair())
+    assert [s.models for s in specs] == [["ResNet18", "MobileNetV2"], ["EfficientNet_B0"]]
+
+    async def scenario():
+        pool = WorkerPool(specs, app_path=STUB_APP)
+        pool.start()
+        try:
+            await wait_for(lambda: all(w.ready for w in pool.workers))
+            shared, single = pool.workers
+
+            for model_name, worker in [("ResNet18", shared), ("MobileNetV2", shared),
+                                       ("EfficientNet_B0", single)]:
+                resp = await pool.forward("/predict/", model_name, {"model_name": model_name}, {})
+                body = resp.body.decode()
+                assert resp.status_code == 200
+                assert f'"pid":{worker.process.pid}' in body
+                assert f'"model_name":"{model_name}"' in body
+            assert (shared.served, single.served) == (2, 1)
+
+            old_pid = single.process.pid
+            single.process.kill()
+            await wait_for(lambda: single.restarts == 1 and single.ready)
+            assert single.process.pid != old_pid
+            assert shared.restarts == 0
+
+            resp = await pool.forward("/predict/", "EfficientNet_B0",
+                                      {"model_name": "EfficientNet_B0"}, {})
+            assert f'"pid":{single.process.pid}' in resp.body.decode()
+        finally:
+            await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_forward_without_ready_worker_is_503():
+    pool = WorkerPool([WorkerSpec(models=["A"], cores=[0], port=9000)])
+    with pytest.raises(gateway.HTTPException) as excinfo:
+        asyncio.run(pool.forward("/predict/", "A", {}, {}))
+    assert excinfo.value.status_code == 503
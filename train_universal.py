@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Universal Perturbation and Adversarial Patch Training Script
+
+This script trains, per model, a universal adversarial perturbation (one
+perturbation that fools the model on most images) and an adversarial patch,
+and stores them in the perturbation library next to the model cache. The
+"Universal" and "LearnedPatch" attacks then apply them without any gradient
+computation at request time.
+
+Usage:
+    python train_universal.py --images path/to/images --models ResNet18 MobileNetV2
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from backend.models import MODEL_NAMES, get_model
+from backend.perturbations import save_perturbation, library_dir
+from backend.utils import preprocess_image
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def load_images(image_dir, limit=None):
+    """Load and preprocess every image in a directory into one tensor."""
+    paths = sorted(p for p in Path(image_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if limit:
+        paths = paths[:limit]
+    if not paths:
+        raise ValueError(f"No images found in {image_dir}")
+    return torch.cat([preprocess_image(Image.open(p).convert("RGB")) for p in paths])
+
+
+def predict_labels(model, images, batch_size):
+    with torch.no_grad():
+        return torch.cat([model(batch).argmax(dim=1) for batch in images.split(batch_size)])
+
+
+def fooling_rate(model, images, labels, apply, batch_size):
+    fooled = 0
+    with torch.no_grad():
+        for batch, batch_labels in zip(images.split(batch_size), labels.split(batch_size)):
+            fooled += (model(apply(batch)).argmax(dim=1) != batch_labels).sum().item()
+    return fooled / len(images)
+
+
+def train_universal(model, images, labels, epsilon, epochs, batch_size, step_size):
+    """
+    Sign-gradient ascent on a single perturbation shared by all images,
+    projected onto the epsilon L-inf ball after every step.
+    """
+    delta = torch.zeros_like(images[:1])
+    for epoch in range(epochs):
+        order = torch.randperm(len(images))
+        for idx in order.split(batch_size):
+            delta.requires_grad_(True)
+            perturbed = torch.clamp(images[idx] + delta, 0, 1)
+            loss = F.cross_entropy(model(perturbed), labels[idx])
+            model.zero_grad()
+            loss.backward()
+            delta = (delta.detach() + step_size * delta.grad.sign()).clamp(-epsilon, epsilon)
+        rate = fooling_rate(model, images, labels, lambda x: torch.clamp(x + delta, 0, 1), batch_size)
+        print(f"   epoch {epoch + 1}/{epochs}: fooling rate {rate:.1%}")
+    return delta.detach(), rate
+
+
+def paste(images, patch, locations):
+    """Differentiable paste of `patch` at a per-image (y, x) location."""
+    _, _, h, w = images.shape
+    size = patch.shape[-1]
+    canvases, masks = [], []
+    ones = torch.ones_like(patch)
+    for y, x in locations:
+        pad = (x, w - x - size, y, h - y - size)
+        canvases.append(F.pad(patch, pad))
+        masks.append(F.pad(ones, pad))
+    canvas, mask = torch.stack(canvases), torch.stack(masks)
+    return images * (1 - mask) + canvas
+
+
+def train_patch(model, images, labels, patch_size, epochs, batch_size, lr):
+    """
+    Optimize a patch that, pasted at random locations, maximizes the loss of
+    the clean prediction.
+    """
+    _, channels, h, w = images.shape
+    patch = torch.rand(channels, patch_size, patch_size, requires_grad=True)
+    optimizer = torch.optim.Adam([patch], lr=lr)
+
+    def random_locations(n):
+        return [(random.randint(0, h - patch_size), random.randint(0, w - patch_size)) for _ in range(n)]
+
+    for epoch in range(epochs):
+        order = torch.randperm(len(images))
+        for idx in order.split(batch_size):
+            patched = paste(images[idx], patch, random_locations(len(idx)))
+            loss = -F.cross_entropy(model(patched), labels[idx])
+            optimizer.zero_grad()
+            model.zero_grad()
+            loss.backward()
+            optimizer.step()
+            with torch.no_grad():
+                patch.clamp_(0, 1)
+        rate = fooling_rate(
+            model, images, labels,
+            lambda x: paste(x, patch.detach(), random_locations(len(x))), batch_size,
+        )
+        print(f"   epoch {epoch + 1}/{epochs}: fooling rate {rate:.1%}")
+    return patch.detach(), rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train universal perturbations and adversarial patches")
+    parser.add_argument("--images", required=True, help="Directory of training images")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_NAMES), choices=list(MODEL_NAMES))
+    parser.add_argument("--kinds", nargs="+", default=["universal", "patch"], choices=["universal", "patch"])
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many images")
+    parser.add_argument("--epsilon", type=float, default=0.05, help="L-inf bound of the universal perturbation")
+    parser.add_argument("--step-size", type=float, default=0.005)
+    parser.add_argument("--patch-size", type=int, default=50)
+    parser.add_argument("--lr", type=float, default=0.05, help="Patch learning rate")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.epochs < 1:
+        parser.error("--epochs must be at least 1")
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    print(f"📥 Loading images from {args.images}...")
+    images = load_images(args.images, args.limit)
+    print(f"✅ Loaded {len(images)} images")
+    print(f"📁 Library: {library_dir()}\n")
+
+    for model_name in args.models:
+        model = get_model(model_name)
+        for p in model.parameters():
+            p.requires_grad_(False)
+        labels = predict_labels(model, images, args.batch_size)
+
+        if "universal" in args.kinds:
+            print(f"🎯 Training universal perturbation for {model_name}...")
+            delta, rate = train_universal(model, images, labels, args.epsilon, args.epochs,
+                                          args.batch_size, args.step_size)
+            path = save_perturbation(model_name, "universal", delta, epsilon=args.epsilon,
+                                     fooling_rate=rate, images=len(images), epochs=args.epochs)
+            print(f"✅ Saved {path}\n")
+
+        if "patch" in args.kinds:
+            print(f"🎯 Training adversarial patch for {model_name}...")
+            patch, rate = train_patch(model, images, labels, args.patch_size, args.epochs,
+                                      args.batch_size, args.lr)
+            path = save_perturbation(model_name, "patch", patch, patch_size=args.patch_size,
+                                     fooling_rate=rate, images=len(images), epochs=args.epochs)
+            print(f"✅ Saved {path}\n")
+
+    print("🎉 Done! Use attack types 'Universal' and 'LearnedPatch' on /attack/.")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Training interrupted by user.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {str(e)}")
+        sys.exit(1)